@@ -1,9 +1,17 @@
+import threading
+from cachetools import TTLCache, cached
 import technical_analysis as ta
 import ta_report_feedback as tafb
 
+# Users often repeat the same query within minutes: reuse the result for 10 minutes
+_RESULT_CACHE = TTLCache(maxsize=512, ttl=600)
+_RESULT_CACHE_LOCK = threading.Lock()
+
+@cached(_RESULT_CACHE, lock=_RESULT_CACHE_LOCK)
 def calculate_net_gain(s, apy, t, deal, symbol):
     """
     Calculate the net gain based on the formula: G = S*I - S*dB
+    Results are cached for 10 minutes per (s, apy, t, deal, symbol).
     
     Parameters:
     s (int): Investment amount
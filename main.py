@@ -11,6 +11,7 @@ from telegram.ext import (
 )
 import os
 import threading
+import numpy as np
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import asyncio
 from config import BOT_TOKEN, DEBUG
@@ -72,20 +73,23 @@ async def calculate_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def process_parameters(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
-        params = update.message.text.split(",")
-        if len(params) != 5:
+        head, _, symbol = update.message.text.rpartition(",")
+        fields = head.split(",")
+        if len(fields) != 4:
             raise ValueError("Numero errato di parametri")
 
-        s = int(params[0])
-        apy = int(params[1])
-        t = int(params[2])
-        deal = int(params[3])
-        symbol = params[4]
+        try:
+            values = np.array(fields, dtype=np.int64)
+        except (ValueError, OverflowError):
+            raise ValueError("I parametri non sono validi")
 
-        if s <= 0 or apy <= 0 or t <= 0 or deal <= 0 or len(symbol) < 3:
+        if values.min() <= 0 or len(symbol) < 3:
             raise ValueError("I parametri non sono validi")
 
-        result = calculate_net_gain(s, apy, t, deal, symbol)
+        s, apy, t, deal = values.tolist()
+
+        # Run the blocking download + analysis off the event loop so other users are still served
+        result = await asyncio.to_thread(calculate_net_gain, s, apy, t, deal, symbol)
 
         response = (
             f"📊 *Risultato del calcolo*\n\n"
@@ -152,7 +156,8 @@ def main() -> None:
         entry_points=[CommandHandler('calculate', calculate_command)],
         states={
             AWAITING_PARAMETERS: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, process_parameters)
+                # Non-blocking: a long calculation must not hold back other users' messages
+                MessageHandler(filters.TEXT & ~filters.COMMAND, process_parameters, block=False)
             ],
         },
         fallbacks=[CommandHandler('cancel', cancel)],
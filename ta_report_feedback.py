@@ -81,11 +81,9 @@ def volumes_fb(report, score, warnings):
 
 
 def fibo_fb(current_price, report, score, warnings):
-    fibo_levels = []
-    for level in report["supporti"]["fibonacci"].values():
-        fibo_levels.append(level[0])
-    min_support = min(fibo_levels)
-    max_resistance = max(fibo_levels)
+    fibo_levels = report["supporti"]["fibonacci_livelli"]
+    min_support = fibo_levels.min()
+    max_resistance = fibo_levels.max()
     if current_price is None:
         current_price = report["montecarlo"]["base_case"]
     if current_price <= min_support * 1.02:
@@ -1,8 +1,42 @@
 import numpy as np
-import pandas as pd
-import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
 import talib
-from datetime import datetime, timedelta
+import math
+import threading
+import urllib.parse
+import urllib3
+from cachetools import TTLCache, cached
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # Senza numba i kernel vengono eseguiti come Python puro
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Cache in memoria: i download OHLCV valgono per l'ora corrente, i report per pochi minuti
+_OHLCV_CACHE = TTLCache(maxsize=256, ttl=1800)
+_OHLCV_CACHE_LOCK = threading.Lock()
+_REPORT_CACHE = TTLCache(maxsize=256, ttl=300)
+_REPORT_CACHE_LOCK = threading.Lock()
+
+# Limita i download concorrenti verso Yahoo Finance quando le analisi girano in thread separati
+_DOWNLOAD_SEMAPHORE = threading.BoundedSemaphore(4)
+
+_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+# Serie OHLCV come array separati (uno per campo), già pronti per le analisi
+OHLCV = namedtuple("OHLCV", ["open", "high", "low", "close", "volume", "ts"])
+
+# Generatore PCG64 condiviso per le simulazioni Monte Carlo
+_RNG = np.random.default_rng()
 
 def fetch_ohlcv(symbol: str, interval: str = "1h", lookback_days: int = 60):
     """
@@ -14,26 +48,51 @@ def fetch_ohlcv(symbol: str, interval: str = "1h", lookback_days: int = 60):
     - `lookback_days` (int): Il numero di giorni da cui partire per scaricare i dati storici.
 
     Restituisce:
-    - `pd.DataFrame`: Un DataFrame contenente i dati OHLCV con colonne rinominate in minuscolo.
+    - `OHLCV`: Una namedtuple con gli array float32 `open`, `high`, `low`, `close`, `volume`
+      e gli istanti `ts` (secondi Unix) di ciascuna candela.
 
     Descrizione:
-    Questa funzione utilizza la libreria `yfinance` per ottenere dati storici di mercato
-    per un determinato simbolo e intervallo temporale. I dati vengono filtrati per il periodo
-    specificato e restituiti come un DataFrame di pandas con colonne rinominate in minuscolo.
+    Questa funzione interroga direttamente l'API chart di Yahoo Finance per ottenere dati storici di mercato
+    per un determinato simbolo e intervallo temporale. Le candele incomplete vengono scartate e i dati
+    restituiti come array numpy contigui, senza passare da un DataFrame.
+    La fine del periodo viene arrotondata all'ora, così richieste ravvicinate per lo stesso simbolo
+    condividono lo stesso download in cache.
     """
-    end = datetime.utcnow()
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    # Come yfinance: simbolo senza spazi e in maiuscolo, così anche la chiave di cache è normalizzata
+    return _download_ohlcv(symbol.strip().upper(), interval, lookback_days, end)
+
+@cached(_OHLCV_CACHE, lock=_OHLCV_CACHE_LOCK)
+def _download_ohlcv(symbol, interval, lookback_days, end):
     start = end - timedelta(days=lookback_days)
-    df = yf.download(symbol, start=start, end=end, interval=interval)
-    df = df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
-    df = df.dropna()
-    return df
+    with _DOWNLOAD_SEMAPHORE:
+        resp = urllib3.request(
+            "GET",
+            _CHART_URL.format(symbol=urllib.parse.quote(symbol, safe="")),
+            fields={"interval": interval, "period1": int(start.timestamp()), "period2": int(end.timestamp())},
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=5.0,
+        )
+    try:
+        chart = resp.json()["chart"]
+    except (ValueError, KeyError):
+        raise RuntimeError(f"Risposta non valida da Yahoo Finance (HTTP {resp.status})")
+    if chart.get("error") or not chart.get("result") or "timestamp" not in chart["result"][0]:
+        raise ValueError(f"Nessun dato disponibile per {symbol}")
+    result = chart["result"][0]
+    quote = result["indicators"]["quote"][0]
+    # I valori mancanti (None) diventano NaN; i prezzi orari stanno comodamente in float32
+    columns = [np.array(quote[field], dtype=np.float32) for field in OHLCV._fields[:-1]]
+    ts = np.array(result["timestamp"], dtype=np.int64)
+    valid = np.logical_and.reduce([np.isfinite(col) for col in columns])
+    return OHLCV(*[col[valid] for col in columns], ts[valid])
 
-def find_support_clusters(df, window=30, min_touches=3, tolerance=0.002):
+def find_support_clusters(low, window=30, min_touches=3, tolerance=0.002):
     """
     Identifica cluster di minimi (supporti) negli ultimi `window` giorni.
 
     Parametri:
-    - `df` (pd.DataFrame): DataFrame contenente i dati OHLCV con colonne come 'low'.
+    - `low` (np.ndarray): Array dei prezzi minimi (float32 o float64, contiguo).
     - `window` (int): Numero di giorni da considerare per l'analisi (default: 30).
     - `min_touches` (int): Numero minimo di tocchi richiesti per identificare un supporto (default: 3).
     - `tolerance` (float): Tolleranza percentuale per considerare i prezzi vicini come parte dello stesso cluster (default: 0.002).
@@ -42,35 +101,62 @@ def find_support_clusters(df, window=30, min_touches=3, tolerance=0.002):
     - `list`: Una lista di prezzi che rappresentano i cluster di supporto identificati.
 
     Descrizione:
-    Questa funzione analizza i prezzi minimi (`low`) di un DataFrame per identificare livelli di supporto
+    Questa funzione analizza i prezzi minimi (`low`) per identificare livelli di supporto
     basati su cluster di prezzi vicini. Un livello di supporto viene considerato valido se il numero di
     tocchi (prezzi vicini al livello) supera il valore di `min_touches`. I cluster vengono arrotondati
     per semplificare l'interpretazione e ordinati in ordine crescente.
     """
-    lows = df['low'][-window*24:]  # window giorni, 24h per giorno
-    clusters = []
-    for i in range(len(lows)):
-        price = lows.iloc[i].values[0]
-        # Conta quanti minimi sono vicini a questo prezzo
-        count = np.sum(np.abs(lows - price) < price * tolerance)
-        if count.values[0] >= min_touches:
-            clusters.append(price)
+    lows = np.sort(low[-window*24:])  # window giorni, 24h per giorno
+    if NUMBA_AVAILABLE:
+        touched = _cluster_core(lows, min_touches, tolerance)
+    else:
+        # Senza numba: i vicini di ogni prezzo si trovano con due ricerche binarie vettoriali
+        band = lows * tolerance
+        counts = np.searchsorted(lows, lows + band, side='left') - np.searchsorted(lows, lows - band, side='right')
+        touched = counts >= min_touches
     # Rimuovi duplicati e ordina
-    clusters = sorted(set([round(c, -2) for c in clusters]))
+    clusters = sorted(set([round(c, -2) for c in lows[touched]]))
     return clusters
 
-def fibonacci_retracement(df, lookback=60*24):
+@njit(['boolean[::1](float32[::1], int64, float64)', 'boolean[::1](float64[::1], int64, float64)'], cache=True)
+def _cluster_core(lows, min_touches, tolerance):
+    """
+    Per ogni minimo conta quanti minimi cadono entro `tolerance` dal suo prezzo e restituisce
+    una maschera booleana dei minimi con almeno `min_touches` tocchi.
+
+    `lows` deve essere ordinato in modo crescente: i vicini di ogni prezzo formano una finestra
+    contigua [lo, hi) che scorre in avanti, quindi il conteggio richiede un solo passaggio.
+    """
+    n = lows.shape[0]
+    out = np.zeros(n, dtype=np.bool_)
+    lo = 0
+    hi = 0
+    for i in range(n):
+        price = lows[i]
+        band = price * tolerance
+        while lo < i and price - lows[lo] >= band:
+            lo += 1
+        while hi < n and lows[hi] - price < band:
+            hi += 1
+        if hi - lo >= min_touches:
+            out[i] = True
+    return out
+
+_FIB_RATIOS = np.array([0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0])
+_FIB_NAMES = ("0.0%", "23.6%", "38.2%", "50.0%", "61.8%", "78.6%", "100.0%")
+
+def fibonacci_retracement(close, lookback=60*24):
     """
     Calcola livelli di Fibonacci retracement sull'ultimo trend significativo.
 
     Parametri:
-    - `df` (pd.DataFrame): DataFrame contenente i dati OHLCV con una colonna 'close' che rappresenta i prezzi di chiusura.
+    - `close` (np.ndarray): Array dei prezzi di chiusura (float32 o float64, contiguo).
     - `lookback` (int): Numero di periodi da considerare per calcolare i livelli di Fibonacci.
       Ad esempio, 60*24 rappresenta 60 giorni di dati orari (24 ore al giorno).
 
     Restituisce:
-    - `dict`: Un dizionario con i livelli di Fibonacci (0.0%, 23.6%, 38.2%, 50.0%, 61.8%, 78.6%, 100.0%)
-      calcolati in base al massimo e minimo dei prezzi di chiusura nel periodo specificato.
+    - `np.ndarray`: Un array con i livelli di Fibonacci (0.0%, 23.6%, 38.2%, 50.0%, 61.8%, 78.6%, 100.0%,
+      nell'ordine di `_FIB_NAMES`) calcolati in base al massimo e minimo dei prezzi di chiusura nel periodo specificato.
 
     Descrizione:
     I livelli di Fibonacci sono utilizzati per identificare potenziali aree di supporto e resistenza
@@ -78,27 +164,19 @@ def fibonacci_retracement(df, lookback=60*24):
     ampiamente utilizzati nell'analisi tecnica per prevedere possibili inversioni di trend o
     continuazioni.
     """
-    closes = df['close'][-lookback:]
+    closes = close[-lookback:]
     max_price = closes.max()
     min_price = closes.min()
     diff = max_price - min_price
-    levels = {
-        "0.0%": max_price,
-        "23.6%": max_price - 0.236 * diff,
-        "38.2%": max_price - 0.382 * diff,
-        "50.0%": max_price - 0.5 * diff,
-        "61.8%": max_price - 0.618 * diff,
-        "78.6%": max_price - 0.786 * diff,
-        "100.0%": min_price,
-    }
+    levels = max_price - _FIB_RATIOS * diff
     return levels
 
-def rsi_analysis(df, period=14):
+def rsi_analysis(close, period=14):
     """
     Calcola l'RSI (Relative Strength Index) e identifica eventuali divergenze.
 
     Parametri:
-    - `df` (pd.DataFrame): DataFrame contenente i dati OHLCV con una colonna 'close' che rappresenta i prezzi di chiusura.
+    - `close` (np.ndarray): Array dei prezzi di chiusura (float32 o float64, contiguo).
     - `period` (int): Periodo di calcolo per l'RSI (default: 14).
 
     Restituisce:
@@ -111,28 +189,69 @@ def rsi_analysis(df, period=14):
     in un determinato periodo. È utile per identificare condizioni di ipercomprato o ipervenduto e possibili divergenze
     tra il prezzo e l'indicatore.
     """
-    close_array = df['close']
-    if isinstance(close_array, pd.DataFrame):
-        close_array = close_array.squeeze()
-    close_array = close_array.astype(float).to_numpy().reshape(-1)
-    rsi = talib.RSI(close_array, timeperiod=period)
-    current_rsi = rsi[-1]
+    if NUMBA_AVAILABLE:
+        current_rsi, code = _rsi_divergence_core(np.ascontiguousarray(close), period)
+    else:
+        close = close.astype(np.float64)  # talib lavora solo in doppia precisione
+        # Storia completa: stesso RSI di Wilder del kernel numba, qualunque sia la build
+        rsi = talib.RSI(close, timeperiod=period)
+        current_rsi = rsi[-1]
+        code = _divergence_code(close[-10:], rsi[-10:])
+    divergence = _DIVERGENCES[code]
+    return current_rsi, divergence
+
+_DIVERGENCES = ("nessuna", "positiva", "negativa")
+
+@njit(['int64(float32[::1], float64[::1])', 'int64(float64[::1], float64[::1])'], cache=True)
+def _divergence_code(close10, rsi10):
+    """
+    Confronta le ultime 5 osservazioni con le 5 precedenti di prezzo e RSI e restituisce
+    l'indice in `_DIVERGENCES` della divergenza rilevata.
+    """
+    price_trend = (close10[5:].sum() - close10[:5].sum()) / 5
+    rsi_trend = (rsi10[5:].sum() - rsi10[:5].sum()) / 5
     # Divergenza: prezzo in calo, RSI in risalita
-    price_trend = close_array[-5:].mean() - close_array[-10:-5].mean()
-    rsi_trend = rsi[-5:].mean() - rsi[-10:-5].mean()
-    divergence = "nessuna"
     if price_trend < 0 < rsi_trend:
-        divergence = "positiva"
-    elif price_trend > 0 > rsi_trend:
-        divergence = "negativa"
-    return current_rsi, divergence
+        return 1
+    if price_trend > 0 > rsi_trend:
+        return 2
+    return 0
 
-def volume_analysis(df, window=30*24):
+@njit(['Tuple((float64, int64))(float32[::1], int64)', 'Tuple((float64, int64))(float64[::1], int64)'], cache=True)
+def _rsi_divergence_core(close, period):
+    """
+    Calcola l'RSI di Wilder (stessa inizializzazione di `talib.RSI`) in un solo passaggio,
+    conservando solo gli ultimi 10 valori, e restituisce l'RSI corrente con il codice di divergenza.
+    """
+    n = close.shape[0]
+    rsi10 = np.full(10, np.nan)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        gain = diff if diff > 0 else 0.0
+        loss = -diff if diff < 0 else 0.0
+        if i < period:
+            avg_gain += gain
+            avg_loss += loss
+            continue
+        if i == period:
+            avg_gain = (avg_gain + gain) / period
+            avg_loss = (avg_loss + loss) / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        if i >= n - 10:
+            total = avg_gain + avg_loss
+            rsi10[i - (n - 10)] = 100 * avg_gain / total if total > 0 else 0.0
+    return rsi10[-1], _divergence_code(close[-10:], rsi10)
+
+def volume_analysis(volume, window=30*24):
     """
     Analizza i volumi rispetto alla media mobile.
 
     Parametri:
-    - `df` (pd.DataFrame): DataFrame contenente i dati OHLCV con una colonna 'volume' che rappresenta i volumi.
+    - `volume` (np.ndarray): Array dei volumi (float32 o float64, contiguo).
     - `window` (int): Numero di periodi da considerare per l'analisi (default: 30 giorni di dati orari, ovvero 30*24).
 
     Restituisce:
@@ -145,26 +264,31 @@ def volume_analysis(df, window=30*24):
     rispetto alla media mobile recente. È utile per individuare anomalie nei volumi di trading che potrebbero indicare
     movimenti significativi del mercato.
     """
-    vol = df['volume'][-window:]
-    ma = vol.rolling(window=window//3).mean()
-    current_vol = vol.iloc[-1].values[0]
-    current_ma = ma.iloc[-1].values[0]
+    vol = volume[-window:]
+    ma_window = window // 3
+    # Servono solo l'ultima media mobile e le ultime 10: NaN se lo storico non basta
+    current_vol = vol[-1]
+    current_ma = vol[-ma_window:].mean() if len(vol) >= ma_window else np.nan
     perc_above_ma = 100 * (current_vol - current_ma) / current_ma if current_ma > 0 else 0
     # Picco volume su supporto: cerca spike negli ultimi 10 periodi
-    recent_vol = vol[-10:].values
-    recent_ma = ma[-10:].values
-    spike = 100 * (recent_vol.max() - recent_ma.mean()) / recent_ma.mean() if recent_ma.mean() > 0 else 0
+    recent_vol = vol[-10:]
+    if len(vol) >= ma_window + 9:
+        recent_ma = sliding_window_view(vol[-(ma_window + 9):], ma_window).mean()
+    else:
+        recent_ma = np.nan
+    spike = 100 * (recent_vol.max() - recent_ma) / recent_ma if recent_ma > 0 else 0
     return perc_above_ma, spike
 
-def monte_carlo_forecast(df, days=30, n_sim=1000, target=95000):
+def monte_carlo_forecast(close, days=30, n_sim=1000, target=95000, per_step=False):
     """
     Esegue una simulazione Monte Carlo per stimare la probabilità che il prezzo futuro superi un valore target.
 
     Parametri:
-    - `df` (pd.DataFrame): DataFrame contenente i dati OHLCV con una colonna 'close' che rappresenta i prezzi di chiusura.
+    - `close` (np.ndarray): Array dei prezzi di chiusura (float32 o float64, contiguo).
     - `days` (int): Numero di giorni per cui eseguire la simulazione (default: 1).
     - `n_sim` (int): Numero di simulazioni Monte Carlo da eseguire (default: 1000).
     - `target` (float): Prezzo target da confrontare con i risultati della simulazione.
+    - `per_step` (bool): Se True simula ogni passo del percorso invece di estrarre direttamente il prezzo finale (default: False).
 
     Restituisce:
     - `tuple`: Una tupla contenente:
@@ -177,36 +301,54 @@ def monte_carlo_forecast(df, days=30, n_sim=1000, target=95000):
     Descrizione:
     La funzione utilizza i rendimenti logaritmici storici per stimare la distribuzione dei prezzi futuri.
     Per ogni simulazione, il prezzo iniziale viene moltiplicato per un fattore casuale basato su una distribuzione normale
-    con media e deviazione standard calcolate dai rendimenti storici. I risultati delle simulazioni vengono analizzati
+    con media e deviazione standard calcolate dai rendimenti storici e scalate sull'orizzonte di `days` passi. I risultati delle simulazioni vengono analizzati
     per calcolare la probabilità di superare il target e i valori previsti nei diversi scenari (bull, base, bear).
     """
-    log_returns = np.log(df['close'] / df['close'].shift(1)).dropna()
+    # exp/log in doppia precisione anche quando i prezzi arrivano in float32
+    close = close.astype(np.float64)
+    log_returns = np.diff(np.log(close))
     mu = float(log_returns.mean())
-    sigma = float(log_returns.std())
+    sigma = float(log_returns.std(ddof=1))
     min_sigma = 1e-4
     if sigma < min_sigma:
         sigma = min_sigma
-    S0 = float(df['close'].iloc[-1])
-    results = []
+    S0 = float(close[-1])
 
     # Se la volatilità è troppo bassa, restituisci valori costanti
     if np.isclose(sigma, 0):
         results = np.full(n_sim, S0)
-    else: # Simulazione Monte Carlo
-        for _ in range(n_sim):
-            price = S0
-            for _ in range(days):
-                price *= np.exp(np.random.normal(mu, sigma))
-            results.append(price)
-        results = np.array(results)
+    elif per_step and NUMBA_AVAILABLE:
+        results = _mc_paths(S0, mu, sigma, days, n_sim)
+    elif per_step:
+        total = _RNG.normal(mu, sigma, size=(n_sim, days)).sum(axis=1)
+        results = S0 * np.exp(total)
+    else:
+        # Somma di `days` normali iid ~ N(mu*days, sigma^2*days): basta un'estrazione per simulazione
+        total = mu * days + sigma * np.sqrt(days) * _RNG.standard_normal(n_sim)
+        results = S0 * np.exp(total)
 
     prob = np.mean(results > target)
     # Scenari
-    bull = np.percentile(results, 80)
-    base = np.percentile(results, 50)
-    bear = np.percentile(results, 20)
+    bull, base, bear = np.percentile(results, [80, 50, 20])
     return prob, bull, base, bear, sigma
 
+@njit(parallel=True, cache=True)
+def _mc_paths(S0, mu, sigma, days, n_sim):
+    """
+    Simula `n_sim` percorsi di prezzo passo per passo, in parallelo sui percorsi. Serve come base
+    per modelli dipendenti dal percorso, dove la forma chiusa del prezzo finale non basta.
+    Compilato alla prima chiamata, così l'import non paga la compilazione finché `per_step` non viene usato.
+    Le estrazioni usano il generatore interno di numba (uno per thread), non `_RNG`.
+    """
+    out = np.empty(n_sim)
+    for i in prange(n_sim):
+        price = S0
+        for _ in range(days):
+            price *= math.exp(mu + sigma * np.random.standard_normal())
+        out[i] = price
+    return out
+
+@cached(_REPORT_CACHE, lock=_REPORT_CACHE_LOCK)
 def auto_ta_analysis(symbol="BTC-USD", timeframe="1h", lookback_days=60, target=55000):
     """
     Esegue un'analisi tecnica automatizzata su un simbolo di mercato specifico.
@@ -219,7 +361,8 @@ def auto_ta_analysis(symbol="BTC-USD", timeframe="1h", lookback_days=60, target=
 
     Restituisce:
     - `dict`: Un dizionario strutturato contenente:
-        - `supporti`: Livelli di supporto identificati (Fibonacci e cluster di minimi).
+        - `supporti`: Livelli di supporto identificati (Fibonacci e cluster di minimi); i livelli di Fibonacci
+          sono sia in un array (`fibonacci_livelli`) sia in un dizionario per la visualizzazione (`fibonacci`).
         - `rsi`: Valore corrente dell'RSI e tipo di divergenza rilevata.
         - `volumi`: Analisi dei volumi rispetto alla media mobile.
         - `montecarlo`: Risultati della simulazione Monte Carlo, inclusa la probabilità di superare il target e scenari previsti.
@@ -230,21 +373,24 @@ def auto_ta_analysis(symbol="BTC-USD", timeframe="1h", lookback_days=60, target=
     - RSI (Relative Strength Index) e divergenze.
     - Analisi dei volumi rispetto alla media mobile.
     - Simulazione Monte Carlo per stimare la probabilità di raggiungere un prezzo target.
+    Il report viene memorizzato per alcuni minuti per gli stessi parametri di input.
     """
-    df = fetch_ohlcv(symbol, interval=timeframe, lookback_days=lookback_days)
+    data = fetch_ohlcv(symbol, interval=timeframe, lookback_days=lookback_days)
+    close, low, volume = data.close, data.low, data.volume
     # 1. Supporti chiave
-    fibo = fibonacci_retracement(df)
-    clusters = find_support_clusters(df)
+    fibo = fibonacci_retracement(close)
+    clusters = find_support_clusters(low)
     # 2. RSI
-    rsi, divergence = rsi_analysis(df)
+    rsi, divergence = rsi_analysis(close)
     # 3. Volumi
-    perc_above_ma, spike = volume_analysis(df)
+    perc_above_ma, spike = volume_analysis(volume)
     # 4. Monte Carlo
-    prob, bull, base, bear, sigma = monte_carlo_forecast(df, days=30, n_sim=1000, target=target)
+    prob, bull, base, bear, sigma = monte_carlo_forecast(close, days=30, n_sim=1000, target=target)
     # Output strutturato
     report = {
         "supporti": {
-            "fibonacci": fibo,
+            "fibonacci": dict(zip(_FIB_NAMES, fibo.tolist())),
+            "fibonacci_livelli": fibo,
             "cluster_minimi": clusters,
         },
         "rsi": {